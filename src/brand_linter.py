@@ -0,0 +1,314 @@
+"""
+Brand Voice Linter
+Fast rule-based checks for generated posts and replies before they go to
+human approval
+
+Rules live in company_docs/brand_rules.json (derived from 05_brand_voice.md).
+All patterns are compiled once when the rules are loaded, so linting a
+candidate is a handful of regex scans.
+"""
+
+import atexit
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+from tracing import traced
+
+
+# Links are matched first (group 1 unset) so their '#fragment' is not a hashtag
+HASHTAG_RE = re.compile(r'(?:https?://|www\.)\S+|(?<![\w#/])#(\w+)', re.IGNORECASE)
+SENTENCE_RE = re.compile(r'[^.!?\n]+[.!?]?')
+STRAY_WHITESPACE_RE = re.compile(r'^\s|\s$|[ \t]{2,}|[ \t]\n|\n{3,}')
+
+
+def _compile(patterns: List[str]) -> re.Pattern:
+    # One alternation per rule; lookarounds keep matches on word boundaries
+    alternation = "|".join(f"(?:{p})" for p in patterns)
+    return re.compile(f"(?<!\\w)(?:{alternation})(?!\\w)", re.IGNORECASE)
+
+
+class BrandLinter:
+    """Compiled brand-voice and policy rules"""
+
+    def __init__(self, rules_file: Optional[str] = None):
+        """
+        Load and compile rules
+
+        Args:
+            rules_file: Path to the rules file (default: BRAND_RULES_FILE or
+                company_docs/brand_rules.json)
+        """
+        path = Path(rules_file or os.getenv('BRAND_RULES_FILE', 'company_docs/brand_rules.json'))
+        if not path.exists():
+            raise FileNotFoundError(f"Brand rules file not found: {path}")
+
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+
+        self.rules = []
+        for rule in config['rules']:
+            rule = dict(rule)
+            if 'patterns' in rule:
+                rule['regex'] = _compile(rule['patterns'])
+            if 'qualifiers' in rule:
+                rule['qualifiers'] = [q.lower() for q in rule['qualifiers']]
+            self.rules.append(rule)
+
+    def lint(self, text: str, content_type: str = "post") -> List[Dict[str, Any]]:
+        """
+        Check text against every rule
+
+        Args:
+            text: Candidate post or reply
+            content_type: "post" or "reply"
+
+        Returns:
+            List of violations, each with rule, severity, message and match
+        """
+        violations = []
+
+        for rule in self.rules:
+            kind = rule['type']
+            found = None
+
+            if kind == 'pattern':
+                match = rule['regex'].search(text)
+                if match:
+                    found = match.group(0)
+
+            elif kind == 'pattern_count':
+                limit = rule['max'].get(content_type)
+                if limit is not None:
+                    matches = rule['regex'].findall(text)
+                    if len(matches) > limit:
+                        found = f"{len(matches)} found, max {limit}"
+
+            elif kind == 'hashtag_count':
+                count = sum(1 for match in HASHTAG_RE.finditer(text) if match.group(1))
+                low = rule.get('min', {}).get(content_type, 0)
+                high = rule.get('max', {}).get(content_type)
+                if count < low or (high is not None and count > high):
+                    found = f"{count} hashtags, expected {low}-{high}"
+
+            elif kind == 'length':
+                limit = rule['max'].get(content_type)
+                if limit is not None and len(text) > limit:
+                    found = f"{len(text)} characters, max {limit}"
+
+            elif kind == 'unqualified_claim':
+                for sentence in SENTENCE_RE.findall(text):
+                    match = rule['regex'].search(sentence)
+                    if match and not any(q in sentence.lower() for q in rule['qualifiers']):
+                        found = match.group(0)
+                        break
+
+            elif kind == 'whitespace':
+                if STRAY_WHITESPACE_RE.search(text):
+                    found = "extra blank lines or trailing spaces"
+
+            if found is not None:
+                violations.append({
+                    'rule': rule['id'],
+                    'severity': rule['severity'],
+                    'message': rule['message'],
+                    'match': found,
+                    'fixable': 'fix' in rule,
+                })
+
+        return violations
+
+    def fix(self, text: str, content_type: str = "post") -> Tuple[str, List[str]]:
+        """
+        Apply automatic fixes for rules that have one
+
+        Args:
+            text: Candidate post or reply
+            content_type: "post" or "reply"
+
+        Returns:
+            Tuple of (fixed text, IDs of rules that changed it)
+        """
+        applied = []
+
+        for rule in self.rules:
+            fix = rule.get('fix')
+            fixed = text
+
+            if fix == 'remove':
+                fixed = rule['regex'].sub('', text)
+            elif fix == 'trim':
+                high = rule.get('max', {}).get(content_type)
+                if high is not None:
+                    fixed = _trim_hashtags(text, high)
+            elif fix == 'normalize':
+                fixed = _normalize_whitespace(text)
+
+            if fixed != text:
+                applied.append(rule['id'])
+                text = fixed
+
+        # Removals can leave stray spaces behind
+        if applied:
+            text = _normalize_whitespace(text)
+        return text, applied
+
+
+def _trim_hashtags(text: str, keep: int) -> str:
+    seen = 0
+
+    def replace(match):
+        nonlocal seen
+        if not match.group(1):
+            return match.group(0)
+        seen += 1
+        return match.group(0) if seen <= keep else ''
+
+    return HASHTAG_RE.sub(replace, text)
+
+
+def _normalize_whitespace(text: str) -> str:
+    lines = [re.sub(r'[ \t]{2,}', ' ', line).rstrip() for line in text.strip().split('\n')]
+    return re.sub(r'\n{3,}', '\n\n', '\n'.join(lines))
+
+
+def errors(violations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Violations that block a candidate from approval"""
+    return [v for v in violations if v['severity'] == 'error']
+
+
+def format_violations(violations: List[Dict[str, Any]]) -> str:
+    """
+    Format violations for display or as regeneration feedback
+
+    Args:
+        violations: Output of BrandLinter.lint
+
+    Returns:
+        One line per violation
+    """
+    return "\n".join(f"- [{v['rule']}] {v['message']}: {v['match']}" for v in violations)
+
+
+_linter: Optional[BrandLinter] = None
+
+
+def get_linter() -> BrandLinter:
+    """Shared linter instance (rules are compiled once per process)"""
+    global _linter
+    if _linter is None:
+        _linter = BrandLinter()
+    return _linter
+
+
+@traced("lint.check")
+def lint_candidate(text: str, content_type: str = "post") -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Auto-fix a candidate, lint the result and record rejection stats
+
+    Args:
+        text: Candidate post or reply
+        content_type: "post" or "reply"
+
+    Returns:
+        Tuple of (possibly fixed text, remaining violations)
+    """
+    linter = get_linter()
+    fixed, applied = linter.fix(text, content_type)
+    violations = linter.lint(fixed, content_type)
+    record_stats(content_type, applied, errors(violations))
+    return fixed, violations
+
+
+def _stats_path() -> Path:
+    return Path(os.getenv('LINT_STATS_FILE', '.state/lint_stats.json'))
+
+
+def load_stats() -> Dict[str, Any]:
+    """
+    Load persisted lint statistics
+
+    Returns:
+        Dictionary with candidates checked and per-rule rejected/fixed counts
+    """
+    path = _stats_path()
+    if path.exists():
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+    return {"checked": {}, "rejected": {}, "fixed": {}}
+
+
+_pending: Dict[str, Dict[str, int]] = {"checked": {}, "rejected": {}, "fixed": {}}
+_pending_lock = threading.Lock()
+
+
+def record_stats(content_type: str, fixed: List[str], blocking: List[Dict[str, Any]]):
+    """
+    Count one lint result in memory (written out by flush_stats)
+
+    Args:
+        content_type: "post" or "reply"
+        fixed: IDs of rules that were auto-fixed
+        blocking: Error-level violations left after fixing
+    """
+    with _pending_lock:
+        checked = _pending["checked"]
+        checked[content_type] = checked.get(content_type, 0) + 1
+        for rule in fixed:
+            _pending["fixed"][rule] = _pending["fixed"].get(rule, 0) + 1
+        for violation in blocking:
+            rejected = _pending["rejected"]
+            rejected[violation['rule']] = rejected.get(violation['rule'], 0) + 1
+
+
+def flush_stats():
+    """Merge counts from this run into the stats file (atomic; runs at exit)"""
+    with _pending_lock:
+        if not any(_pending.values()):
+            return
+        stats = load_stats()
+        for section, counts in _pending.items():
+            for key, count in counts.items():
+                stats[section][key] = stats[section].get(key, 0) + count
+            counts.clear()
+
+        path = _stats_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(stats, f, indent=2)
+        tmp.replace(path)
+
+
+atexit.register(flush_stats)
+
+
+def stats_summary(stats: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Summarize rejection and auto-fix rates by rule
+
+    Args:
+        stats: Loaded statistics (default: load_stats())
+
+    Returns:
+        Human-readable summary
+    """
+    stats = stats if stats is not None else load_stats()
+    checked = sum(stats["checked"].values())
+    by_type = ", ".join(f"{t}: {n}" for t, n in stats["checked"].items())
+    lines = [f"Candidates linted: {checked} ({by_type})"]
+    for rule in sorted(set(stats["rejected"]) | set(stats["fixed"])):
+        rejected = stats["rejected"].get(rule, 0)
+        fixed = stats["fixed"].get(rule, 0)
+        lines.append(f"  {rule:<20} rejected {rejected:>4} ({rejected / (checked or 1):.0%})  auto-fixed {fixed:>4}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    print(stats_summary())
@@ -0,0 +1,363 @@
+"""
+Engagement Sync
+Incrementally syncs favourites, boosts and replies for everything we published
+into a local SQLite store, and ranks post types and keywords by engagement
+"""
+
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+from mastodon import MastodonNotFoundError, MastodonVersionError
+
+from tracing import traced, propagate
+
+
+BATCH_SIZE = 40  # Mastodon's limit for multi-status fetches and page sizes
+
+POST_TYPES = ["thought_leadership", "product_update", "industry_insight", "customer_story"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS published (
+    status_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    post_type TEXT,
+    keyword TEXT,
+    in_reply_to_id TEXT,
+    created_at TEXT,
+    url TEXT,
+    favourites INTEGER DEFAULT 0,
+    boosts INTEGER DEFAULT 0,
+    replies INTEGER DEFAULT 0,
+    last_synced REAL
+);
+CREATE INDEX IF NOT EXISTS published_created ON published (created_at);
+CREATE TABLE IF NOT EXISTS snapshots (
+    status_id TEXT NOT NULL,
+    synced_at REAL NOT NULL,
+    favourites INTEGER,
+    boosts INTEGER,
+    replies INTEGER
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class EngagementStore:
+    """SQLite store of our published statuses and their engagement counts"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        """
+        Args:
+            db_path: SQLite file (default: ANALYTICS_DB or .state/analytics.db)
+        """
+        path = Path(db_path or os.getenv('ANALYTICS_DB', '.state/analytics.db'))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def get_state(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def set_state(self, key: str, value: str):
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO sync_state (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, value)
+            )
+
+    def record_published(
+        self,
+        status: Dict[str, Any],
+        kind: Optional[str] = None,
+        post_type: Optional[str] = None,
+        keyword: Optional[str] = None
+    ):
+        """
+        Add or update a status we published, keeping any known metadata
+
+        Args:
+            status: Status dictionary from Mastodon
+            kind: "post" or "reply" (default: inferred from in_reply_to_id)
+            post_type: Post type used to generate it, if known
+            keyword: Search keyword that led to the reply, if known
+        """
+        self.upsert_statuses([status], kind=kind, post_type=post_type, keyword=keyword)
+
+    def upsert_statuses(
+        self,
+        statuses: List[Dict[str, Any]],
+        kind: Optional[str] = None,
+        post_type: Optional[str] = None,
+        keyword: Optional[str] = None
+    ):
+        """
+        Insert or refresh many statuses in one transaction
+
+        Counts that changed since the last sync are also written to the
+        snapshots table so engagement can be tracked over time.
+
+        Args:
+            statuses: Status dictionaries from Mastodon
+            kind: Override for every status ("post" or "reply")
+            post_type: Post type to tag new rows with
+            keyword: Keyword to tag new rows with
+        """
+        now = time.time()
+        with self.conn:
+            for status in statuses:
+                status_id = str(status['id'])
+                counts = (
+                    status.get('favourites_count', 0),
+                    status.get('reblogs_count', 0),
+                    status.get('replies_count', 0),
+                )
+                previous = self.conn.execute(
+                    "SELECT favourites, boosts, replies FROM published WHERE status_id = ?",
+                    (status_id,)
+                ).fetchone()
+
+                created = status.get('created_at')
+                if isinstance(created, datetime):
+                    created = created.astimezone(timezone.utc).isoformat()
+
+                self.conn.execute(
+                    """
+                    INSERT INTO published (status_id, kind, post_type, keyword, in_reply_to_id,
+                                           created_at, url, favourites, boosts, replies, last_synced)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(status_id) DO UPDATE SET
+                        post_type = COALESCE(excluded.post_type, published.post_type),
+                        keyword = COALESCE(excluded.keyword, published.keyword),
+                        favourites = excluded.favourites,
+                        boosts = excluded.boosts,
+                        replies = excluded.replies,
+                        last_synced = excluded.last_synced
+                    """,
+                    (
+                        status_id,
+                        kind or ("reply" if status.get('in_reply_to_id') else "post"),
+                        post_type,
+                        keyword,
+                        str(status['in_reply_to_id']) if status.get('in_reply_to_id') else None,
+                        created,
+                        status.get('url'),
+                        *counts,
+                        now,
+                    )
+                )
+                if previous is None or tuple(previous) != counts:
+                    self.conn.execute(
+                        "INSERT INTO snapshots (status_id, synced_at, favourites, boosts, replies) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (status_id, now, *counts)
+                    )
+
+    def recent_ids(self, days: int) -> List[str]:
+        """IDs of statuses published in the last `days` days"""
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+        rows = self.conn.execute(
+            "SELECT status_id FROM published WHERE created_at >= ? ORDER BY created_at DESC",
+            (cutoff,)
+        ).fetchall()
+        return [row["status_id"] for row in rows]
+
+    def mark_deleted(self, status_ids: List[str]):
+        """Drop statuses that no longer exist on the server, with their snapshots"""
+        rows = [(i,) for i in status_ids]
+        with self.conn:
+            self.conn.executemany("DELETE FROM snapshots WHERE status_id = ?", rows)
+            self.conn.executemany("DELETE FROM published WHERE status_id = ?", rows)
+
+    def engagement_by(self, dimension: str, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Average engagement grouped by post_type or keyword
+
+        Score weights replies over boosts over favourites, since conversations
+        matter most for community building.
+
+        Args:
+            dimension: "post_type" or "keyword"
+            kind: Optionally restrict to "post" or "reply"
+
+        Returns:
+            Rows with value, count, averages and score, best first
+        """
+        if dimension not in ("post_type", "keyword"):
+            raise ValueError(f"Unknown dimension: {dimension}")
+
+        query = f"""
+            SELECT {dimension} AS value,
+                   COUNT(*) AS count,
+                   AVG(favourites) AS avg_favourites,
+                   AVG(boosts) AS avg_boosts,
+                   AVG(replies) AS avg_replies,
+                   AVG(favourites + 2 * boosts + 3 * replies) AS score
+            FROM published
+            WHERE {dimension} IS NOT NULL {"AND kind = ?" if kind else ""}
+            GROUP BY {dimension}
+            ORDER BY score DESC
+        """
+        return [dict(row) for row in self.conn.execute(query, (kind,) if kind else ())]
+
+    def close(self):
+        self.conn.close()
+
+
+@traced("engagement.sync")
+def sync_engagement(
+    mastodon,
+    store: EngagementStore,
+    refresh_days: int = None,
+    max_workers: int = 4
+) -> Dict[str, int]:
+    """
+    Incrementally sync our statuses and their engagement counts
+
+    New statuses are discovered by paging forward from a stored cursor
+    (min_id), so history is never re-fetched. Counts for statuses from the
+    last `refresh_days` days are refreshed with batched multi-status requests
+    (40 IDs each) run concurrently. Servers older than Mastodon 4.3 fall back
+    to concurrent single-status fetches.
+
+    Args:
+        mastodon: MastodonClient instance
+        store: EngagementStore to write to
+        refresh_days: How far back counts are refreshed (default: ENGAGEMENT_REFRESH_DAYS or 14)
+        max_workers: Concurrent refresh requests
+
+    Returns:
+        Dictionary with counts of discovered, refreshed, deleted and failed statuses
+    """
+    if refresh_days is None:
+        refresh_days = int(os.getenv('ENGAGEMENT_REFRESH_DAYS', '14'))
+
+    cursor_key = f"cursor:{mastodon.api_base_url}:{mastodon.account_id}"
+    cursor = store.get_state(cursor_key) or "0"  # "0" backfills history on the first run
+
+    # 1. Discover statuses published since the last sync
+    discovered = 0
+    while True:
+        page = mastodon.get_own_statuses(min_id=cursor, limit=BATCH_SIZE)
+        if not page:
+            break
+        # Boosts are skipped, but still advance the cursor and count toward a full page
+        own = [s for s in page if not s.get('reblog')]
+        store.upsert_statuses(own)
+        discovered += len(own)
+        cursor = str(max(int(s['id']) for s in page))
+        store.set_state(cursor_key, cursor)
+        if len(page) < BATCH_SIZE:
+            break
+
+    # 2. Refresh counts for recent statuses in concurrent batches
+    ids = store.recent_ids(refresh_days)
+    batches = [ids[i:i + BATCH_SIZE] for i in range(0, len(ids), BATCH_SIZE)]
+
+    def fetch_batch(batch):
+        """
+        Returns (statuses, deleted IDs, failed count). A status only counts as
+        deleted on a definite not-found; any other error (network, rate limit)
+        leaves its row untouched until the next sync.
+        """
+        try:
+            statuses = mastodon.get_posts(batch)
+            # The multi-status endpoint silently leaves out deleted statuses
+            found = {str(s['id']) for s in statuses}
+            return statuses, [i for i in batch if i not in found], 0
+        except (MastodonNotFoundError, MastodonVersionError):
+            pass  # Pre-4.3 servers have no multi-status endpoint
+        except Exception as e:
+            print(f"⚠️  Could not refresh {len(batch)} statuses: {e}")
+            return [], [], len(batch)
+
+        statuses, deleted, failed = [], [], 0
+        for status_id in batch:
+            try:
+                statuses.append(mastodon.get_post(status_id))
+            except MastodonNotFoundError:
+                deleted.append(status_id)
+            except Exception as e:
+                print(f"⚠️  Could not refresh status {status_id}: {e}")
+                failed += 1
+        return statuses, deleted, failed
+
+    refreshed = 0
+    failed = 0
+    deleted = []
+    if batches:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as executor:
+            for statuses, gone, errors in executor.map(propagate(fetch_batch), batches):
+                store.upsert_statuses(statuses)
+                refreshed += len(statuses)
+                deleted.extend(gone)
+                failed += errors
+
+    if deleted:
+        store.mark_deleted(deleted)
+
+    print(f"✓ Engagement sync: {discovered} new, {refreshed} refreshed, "
+          f"{len(deleted)} removed, {failed} failed")
+    return {"discovered": discovered, "refreshed": refreshed, "deleted": len(deleted), "failed": failed}
+
+
+def suggest(
+    store: EngagementStore,
+    dimension: str,
+    candidates: List[str],
+    min_samples: int = 3
+) -> str:
+    """
+    Pick the next post_type or keyword to schedule
+
+    Candidates with fewer than min_samples published items are tried first
+    (so every option gets measured); after that the best-scoring one wins.
+
+    Args:
+        store: EngagementStore with synced data
+        dimension: "post_type" or "keyword"
+        candidates: Values to choose from
+        min_samples: Items needed before a candidate's score is trusted
+
+    Returns:
+        The chosen candidate
+    """
+    stats = {row["value"]: row for row in store.engagement_by(dimension)}
+
+    under_sampled = [c for c in candidates if stats.get(c, {"count": 0})["count"] < min_samples]
+    if under_sampled:
+        return min(under_sampled, key=lambda c: stats.get(c, {"count": 0})["count"])
+
+    return max(candidates, key=lambda c: stats[c]["score"])
+
+
+def format_engagement_report(store: EngagementStore) -> str:
+    """
+    Render engagement by post type and by keyword
+
+    Args:
+        store: EngagementStore with synced data
+
+    Returns:
+        Report text
+    """
+    lines = []
+    for dimension, kind, title in (("post_type", "post", "POST TYPES"), ("keyword", "reply", "REPLY KEYWORDS")):
+        lines.append(f"\n{title}")
+        lines.append(f"{'value':<28} {'n':>4} {'favs':>6} {'boosts':>7} {'replies':>8} {'score':>6}")
+        for row in store.engagement_by(dimension, kind):
+            lines.append(
+                f"{row['value'][:28]:<28} {row['count']:>4} {row['avg_favourites']:>6.1f} "
+                f"{row['avg_boosts']:>7.1f} {row['avg_replies']:>8.1f} {row['score']:>6.1f}"
+            )
+    return "\n".join(lines)
@@ -0,0 +1,162 @@
+"""
+HTML to Text
+Fast converter for Mastodon status HTML, shared by prompt building,
+thread summaries and display
+
+Mastodon's own markup (<p>, </p>, <br />) is rewritten with plain
+str.replace. One compiled regex then catches other block and <br> spellings,
+and another drops every remaining tag. Entities are decoded, and
+non-breaking spaces are folded into normal spaces. Mentions and hashtags
+keep their visible text (@user, #tag). Mastodon's shortened links come out
+as the full URL because the hidden parts (span.invisible) are kept.
+
+Cold conversions run at about the speed of the old replace-and-strip cleanup
+(./bench_html_text). Results are memoized by status ID, so a post formatted
+several times per run is converted only once.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from html import unescape
+from typing import List, Dict, Any
+
+from tracing import traced
+
+
+# Block and line-break tags in any spelling: <P class="x">, <br/>, <div>, ...
+# (the lookahead rejects <a>/<span> on their first letter, before the alternation)
+BREAK_TAG_RE = re.compile(r'<(/?)(?=[pdbuolhPDBUOLH])(p|div|blockquote|pre|ul|ol|h[1-6]|br|li)\b[^>]*>',
+                          re.IGNORECASE)
+ANY_TAG_RE = re.compile(r'<[a-zA-Z/!][^>]*+>')
+SPACES_RE = re.compile(r' {2,}')
+EXTRA_NEWLINES_RE = re.compile(r'\n{3,}')
+WHITESPACE_TABLE = str.maketrans('\t\r\n\f\v', '     ')
+
+CACHE_SIZE = 4096
+
+
+def _break_tag(match: re.Match) -> str:
+    tag = match.group(2).lower()
+    if tag == 'br' or tag == 'li':
+        return '' if match.group(1) else '\n'
+    return '\n\n'
+
+
+def _unescape(text: str) -> str:
+    # The entities Mastodon emits, by str.replace; '&amp;' last so '&amp;lt;'
+    # stays '&lt;'. Anything else goes through html.unescape.
+    text = (text.replace('&quot;', '"').replace('&#39;', "'").replace('&lt;', '<')
+            .replace('&gt;', '>').replace('&nbsp;', ' '))
+    if text.count('&') == text.count('&amp;'):
+        return text.replace('&amp;', '&')
+    return unescape(text)
+
+
+def html_to_text(html_content: str) -> str:
+    """
+    Convert status HTML to plain text
+
+    Args:
+        html_content: HTML string
+
+    Returns:
+        Plain text, with paragraphs separated by a blank line
+    """
+    if not html_content:
+        return ""
+
+    # Source whitespace is insignificant in HTML; only tags produce line breaks
+    text = html_content
+    if '\n' in text or '\t' in text or '\r' in text:
+        text = text.translate(WHITESPACE_TABLE)
+
+    # Mastodon's canonical markup first (C-speed), then any other spellings
+    text = text.replace('</p>', '\n\n').replace('<p>', '').replace('<br />', '\n').replace('<br>', '\n')
+    text = ANY_TAG_RE.sub('', BREAK_TAG_RE.sub(_break_tag, text))
+
+    if '&' in text:
+        text = _unescape(text)
+    if '\xa0' in text:
+        text = text.replace('\xa0', ' ')
+    if '  ' in text:
+        text = SPACES_RE.sub(' ', text)
+    if '\n' in text:
+        text = text.replace(' \n', '\n').replace('\n ', '\n')
+        if '\n\n\n' in text:
+            text = EXTRA_NEWLINES_RE.sub('\n\n', text)
+    return text.strip()
+
+
+_cache: "OrderedDict[tuple, str]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def _cache_key(status: Dict[str, Any]) -> tuple:
+    # Edited statuses get new content under the same ID
+    return (str(status['id']), str(status.get('edited_at') or ''))
+
+
+def status_text(status: Dict[str, Any]) -> str:
+    """
+    Plain text of a status, memoized by status ID
+
+    Args:
+        status: Status dictionary from Mastodon
+
+    Returns:
+        Plain text of the status content
+    """
+    key = _cache_key(status)
+    with _lock:
+        text = _cache.get(key)
+        if text is not None:
+            _cache.move_to_end(key)
+            return text
+
+    text = html_to_text(status['content'])
+    with _lock:
+        _cache[key] = text
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return text
+
+
+@traced("html.statuses_text")
+def statuses_text(statuses: List[Dict[str, Any]]) -> List[str]:
+    """
+    Convert a whole page of statuses at once
+
+    Cache lookups and inserts take the lock once per page instead of once
+    per status.
+
+    Args:
+        statuses: Status dictionaries from Mastodon
+
+    Returns:
+        Plain text for each status, in the same order
+    """
+    keys = [_cache_key(status) for status in statuses]
+    with _lock:
+        texts = [_cache.get(key) for key in keys]
+
+    converted = {}
+    for i, text in enumerate(texts):
+        if text is None:
+            texts[i] = converted[keys[i]] = html_to_text(statuses[i]['content'])
+
+    with _lock:
+        for key in keys:
+            if key in converted:
+                _cache[key] = converted[key]
+            elif key in _cache:
+                _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return texts
+
+
+def clear_cache():
+    """Forget memoized conversions"""
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,270 @@
+"""
+Hedged LLM Requests
+Cuts tail latency of structured-output calls by racing a backup request
+against a slow primary one
+
+Set LLM_HEDGE=true in .env to enable. If the primary request hasn't finished
+by the configured latency percentile, a duplicate goes to LLM_HEDGE_BACKUP_MODEL.
+The first valid structured response wins and the other request is cancelled.
+"""
+
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from openai import AsyncOpenAI, OpenAI
+
+from tracing import span
+
+
+MAX_SAMPLES = 200  # Latency samples kept per model
+MIN_SAMPLES = 10   # Below this, fall back to LLM_HEDGE_DEFAULT_DEADLINE
+
+
+def hedging_enabled() -> bool:
+    """Whether hedged requests are turned on"""
+    return os.getenv('LLM_HEDGE', 'false').lower() == 'true'
+
+
+def _stats_path() -> Path:
+    return Path(os.getenv('LLM_HEDGE_STATS_FILE', '.state/llm_hedge_stats.json'))
+
+
+def load_stats() -> Dict[str, Any]:
+    """
+    Load persisted hedging statistics
+
+    Returns:
+        Dictionary with per-model latency samples and hedge counters
+    """
+    path = _stats_path()
+    if path.exists():
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return _with_defaults(json.load(f))
+        except (OSError, ValueError):
+            pass
+    return _with_defaults({})
+
+
+def _with_defaults(stats: Dict[str, Any]) -> Dict[str, Any]:
+    # Older stats files predate the censored/primary_failures counters
+    defaults = {"latencies": {}, "censored": {}, "calls": 0, "hedged": 0,
+                "backup_wins": 0, "primary_failures": 0, "saved_seconds": 0.0}
+    for key, value in defaults.items():
+        stats.setdefault(key, value)
+    return stats
+
+
+def _save_stats(stats: Dict[str, Any]):
+    path = _stats_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix('.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(stats, f)
+    tmp.replace(path)
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def hedge_deadline(model: str, stats: Optional[Dict[str, Any]] = None) -> float:
+    """
+    Seconds to wait for the primary request before sending the backup
+
+    Uses the LLM_HEDGE_PERCENTILE (default 95) of recent latencies for the
+    model, or LLM_HEDGE_DEFAULT_DEADLINE (default 10s) until enough samples
+    have been collected. Primaries cancelled because the backup won count
+    with the time they had run so far (a lower bound), so slow requests
+    keep pulling the deadline up instead of dropping out of the samples.
+
+    Args:
+        model: Primary model name
+        stats: Loaded statistics (default: load_stats())
+
+    Returns:
+        Deadline in seconds
+    """
+    stats = stats if stats is not None else load_stats()
+    samples = stats["latencies"].get(model, [])
+    if len(samples) < MIN_SAMPLES:
+        return float(os.getenv('LLM_HEDGE_DEFAULT_DEADLINE', '10'))
+    return _percentile(samples, float(os.getenv('LLM_HEDGE_PERCENTILE', '95')))
+
+
+async def _hedged_parse(
+    client: OpenAI,
+    model: str,
+    backup_model: str,
+    messages: List[Dict[str, str]],
+    response_format: Any,
+    deadline: float
+):
+    aclient = AsyncOpenAI(api_key=client.api_key, base_url=str(client.base_url))
+
+    async def attempt(attempt_model):
+        response = await aclient.beta.chat.completions.parse(
+            model=attempt_model,
+            messages=messages,
+            response_format=response_format,
+        )
+        if response.choices[0].message.parsed is None:
+            raise ValueError(f"{attempt_model} returned no structured output")
+        return response
+
+    started = time.monotonic()
+    primary = asyncio.create_task(attempt(model))
+    labels = {primary: "primary"}
+    pending = {primary}
+    hedged = False
+    last_error = None
+    # How the primary ended: "ok", "failed" or "cancelled" (still running when the backup won)
+    outcome = {"hedged": False, "primary": "cancelled", "primary_elapsed": None}
+
+    try:
+        while True:
+            timeout = None if hedged else max(0.0, deadline - (time.monotonic() - started))
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            now = time.monotonic() - started
+
+            if primary in done:
+                outcome["primary"] = "ok" if primary.exception() is None else "failed"
+                outcome["primary_elapsed"] = now
+
+            # If both finished in the same tick, the primary wins
+            for task in sorted(done, key=lambda t: labels[t] != "primary"):
+                if task.exception() is None:
+                    if outcome["primary_elapsed"] is None:
+                        outcome["primary_elapsed"] = now  # censored: at least this long
+                    outcome.update(winner=labels[task], elapsed=now)
+                    return task.result(), outcome
+                last_error = task.exception()
+
+            if not hedged and (not done or not pending):
+                # Primary is past its deadline (a hedge) or failed (a retry) - start the backup
+                hedged = True
+                outcome["hedged"] = not done
+                backup = asyncio.create_task(attempt(backup_model))
+                labels[backup] = "backup"
+                pending.add(backup)
+            elif not pending:
+                raise last_error
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        await aclient.close()
+
+
+def parse_completion(
+    client: OpenAI,
+    model: str,
+    messages: List[Dict[str, str]],
+    response_format: Any
+):
+    """
+    Run a structured-output chat completion, hedged when LLM_HEDGE=true
+
+    Args:
+        client: OpenAI/OpenRouter client from create_llm_client()
+        model: Primary model
+        messages: Chat messages
+        response_format: Pydantic model for the structured output
+
+    Returns:
+        The completion response (same shape as client.beta.chat.completions.parse)
+    """
+    with span("llm.parse", model=model, schema=getattr(response_format, '__name__', '')) as s:
+        response = _parse_completion(client, model, messages, response_format, s)
+        usage = getattr(response, 'usage', None)
+        if usage is not None:
+            s.set("prompt_tokens", getattr(usage, 'prompt_tokens', 0) or 0)
+            s.set("completion_tokens", getattr(usage, 'completion_tokens', 0) or 0)
+        return response
+
+
+def _parse_completion(client, model, messages, response_format, s):
+    if not hedging_enabled():
+        return client.beta.chat.completions.parse(
+            model=model,
+            messages=messages,
+            response_format=response_format,
+        )
+
+    backup_model = os.getenv('LLM_HEDGE_BACKUP_MODEL', model)
+    stats = load_stats()
+    deadline = hedge_deadline(model, stats)
+
+    response, outcome = asyncio.run(
+        _hedged_parse(client, model, backup_model, messages, response_format, deadline)
+    )
+
+    # hedged: the backup was raced against a primary past its deadline
+    hedged, winner, elapsed = outcome["hedged"], outcome["winner"], outcome["elapsed"]
+    s.set("hedged", hedged)
+    s.set("winner", winner)
+    s.set("primary", outcome["primary"])
+    stats["calls"] += 1
+    if hedged:
+        stats["hedged"] += 1
+
+    samples = stats["latencies"].setdefault(model, [])
+    if outcome["primary"] == "failed":
+        # The backup was a retry, not a race: no latency sample, no saving
+        stats["primary_failures"] += 1
+        print(f"⚠️  {model} failed; {backup_model} answered after {elapsed:.1f}s")
+    elif winner == "backup":
+        # The primary was cancelled while still running. Estimate its latency
+        # from past requests that ran longer than this one (0 if there are none)
+        longer = sorted(x for x in samples if x > elapsed)
+        saved = longer[len(longer) // 2] - elapsed if longer else 0.0
+        stats["backup_wins"] += 1
+        stats["saved_seconds"] += saved
+        stats["censored"][model] = stats["censored"].get(model, 0) + 1
+        print(f"⚡ Hedged request: {backup_model} answered first after {elapsed:.1f}s (~{saved:.1f}s saved)")
+
+    if outcome["primary"] != "failed":
+        samples.append(round(outcome["primary_elapsed"], 3))
+        del samples[:-MAX_SAMPLES]
+    _save_stats(stats)
+
+    return response
+
+
+def hedge_summary(stats: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Summarize hedge rate and estimated latency saved
+
+    Args:
+        stats: Loaded statistics (default: load_stats())
+
+    Returns:
+        Human-readable summary
+    """
+    stats = stats if stats is not None else load_stats()
+    calls = stats["calls"] or 1
+    lines = [
+        f"Hedged calls: {stats['calls']}",
+        f"Hedge rate: {stats['hedged'] / calls:.0%}",
+        f"Backup wins: {stats['backup_wins']}",
+        f"Primary failures (retried on backup): {stats['primary_failures']}",
+        f"Estimated latency saved: {stats['saved_seconds']:.1f}s",
+    ]
+    for model, samples in stats["latencies"].items():
+        if samples:
+            lines.append(
+                f"{model}: p50 {_percentile(samples, 50):.1f}s, "
+                f"p95 {_percentile(samples, 95):.1f}s ({len(samples)} samples, "
+                f"{stats['censored'].get(model, 0)} cancelled primaries recorded as lower bounds)"
+            )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    print(hedge_summary())
@@ -5,16 +5,40 @@ Wrapper for posting and searching on Mastodon
 
 from mastodon import Mastodon
 import os
-from typing import List, Dict, Any
+import requests
+from typing import List, Dict, Any, Optional
+
+from html_text import status_text
+from tracing import traced
 
 
 class MastodonClient:
     """Client for interacting with Mastodon API"""
 
-    def __init__(self):
-        """Initialize Mastodon client with credentials from environment"""
-        access_token = os.getenv('MASTODON_ACCESS_TOKEN')
-        api_base_url = os.getenv('MASTODON_API_BASE_URL', 'https://mastodon.social')
+    @traced("mastodon.connect")
+    def __init__(
+        self,
+        access_token: Optional[str] = None,
+        api_base_url: Optional[str] = None,
+        session: Optional[requests.Session] = None,
+        ratelimit_method: str = "wait",
+        request_timeout: float = 300
+    ):
+        """
+        Initialize Mastodon client
+
+        Credentials default to MASTODON_ACCESS_TOKEN / MASTODON_API_BASE_URL
+        from the environment. Pass them explicitly to connect to another account.
+
+        Args:
+            access_token: Account access token
+            api_base_url: Instance URL, e.g. https://mastodon.social
+            session: Shared requests session for connection reuse
+            ratelimit_method: Mastodon.py rate limit handling ('wait', 'pace', 'throw')
+            request_timeout: Seconds before an API request is abandoned
+        """
+        access_token = access_token or os.getenv('MASTODON_ACCESS_TOKEN')
+        api_base_url = api_base_url or os.getenv('MASTODON_API_BASE_URL', 'https://mastodon.social')
 
         if not access_token:
             raise ValueError(
@@ -29,25 +53,39 @@ class MastodonClient:
                 "Get it from: https://mastodon.social/settings/applications"
             )
 
+        self.api_base_url = api_base_url
         self.client = Mastodon(
             access_token=access_token,
-            api_base_url=api_base_url
+            api_base_url=api_base_url,
+            session=session,
+            ratelimit_method=ratelimit_method,
+            request_timeout=request_timeout
         )
 
         # Verify credentials
         try:
             account = self.client.me()
+            self.username = account['username']
+            self.account_id = account['id']
             print(f"✓ Connected to Mastodon as @{account['username']}")
         except Exception as e:
             raise ValueError(f"Failed to authenticate with Mastodon: {e}")
 
-    def post(self, content: str, visibility: str = "public") -> Dict[str, Any]:
+    @traced("mastodon.post")
+    def post(
+        self,
+        content: str,
+        visibility: str = "public",
+        idempotency_key: Optional[str] = None
+    ) -> Dict[str, Any]:
         """
         Post a status update (toot) to Mastodon
 
         Args:
             content: The text content to post
             visibility: Post visibility ('public', 'unlisted', 'private', 'direct')
+            idempotency_key: Optional key; the server returns the original status
+                instead of posting again if the same key is reused (for ~1 hour)
 
         Returns:
             Dictionary containing the posted status information
@@ -55,7 +93,8 @@ class MastodonClient:
         try:
             status = self.client.status_post(
                 content,
-                visibility=visibility
+                visibility=visibility,
+                idempotency_key=idempotency_key
             )
             print(f"✓ Posted to Mastodon: {status['url']}")
             return status
@@ -63,6 +102,7 @@ class MastodonClient:
             print(f"✗ Failed to post to Mastodon: {e}")
             raise
 
+    @traced("mastodon.search_posts")
     def search_posts(
         self,
         query: str,
@@ -93,11 +133,13 @@ class MastodonClient:
             print(f"✗ Failed to search Mastodon: {e}")
             raise
 
+    @traced("mastodon.reply")
     def reply(
         self,
         post_id: str,
         content: str,
-        visibility: str = "public"
+        visibility: str = "public",
+        idempotency_key: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Reply to an existing post
@@ -106,6 +148,7 @@ class MastodonClient:
             post_id: ID of the post to reply to
             content: Reply text content
             visibility: Reply visibility
+            idempotency_key: Optional key to make retries safe (see post())
 
         Returns:
             Dictionary containing the posted reply information
@@ -114,7 +157,8 @@ class MastodonClient:
             status = self.client.status_post(
                 content,
                 in_reply_to_id=post_id,
-                visibility=visibility
+                visibility=visibility,
+                idempotency_key=idempotency_key
             )
             print(f"✓ Replied to post {post_id}: {status['url']}")
             return status
@@ -122,6 +166,7 @@ class MastodonClient:
             print(f"✗ Failed to reply to post {post_id}: {e}")
             raise
 
+    @traced("mastodon.get_account_info")
     def get_account_info(self) -> Dict[str, Any]:
         """
         Get information about the authenticated account
@@ -131,6 +176,7 @@ class MastodonClient:
         """
         return self.client.me()
 
+    @traced("mastodon.get_post")
     def get_post(self, post_id: str) -> Dict[str, Any]:
         """
         Get a specific post by ID
@@ -143,6 +189,46 @@ class MastodonClient:
         """
         return self.client.status(post_id)
 
+    @traced("mastodon.get_own_statuses")
+    def get_own_statuses(self, min_id: Optional[str] = None, limit: int = 40) -> List[Dict[str, Any]]:
+        """
+        Get the authenticated account's statuses, oldest first after a cursor
+
+        Args:
+            min_id: Only return statuses newer than this ID (None: most recent page)
+            limit: Maximum statuses per page (Mastodon caps this at 40)
+
+        Returns:
+            List of status dictionaries
+        """
+        return self.client.account_statuses(self.account_id, min_id=min_id, limit=limit)
+
+    @traced("mastodon.get_posts")
+    def get_posts(self, post_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Get several posts in one request (Mastodon 4.3+)
+
+        Args:
+            post_ids: IDs of the posts to retrieve (up to 40)
+
+        Returns:
+            List of post dictionaries (missing or deleted posts are left out)
+        """
+        return self.client.statuses(post_ids)
+
+    @traced("mastodon.get_status_context")
+    def get_status_context(self, post_id: str) -> Dict[str, Any]:
+        """
+        Get the conversation around a post
+
+        Args:
+            post_id: ID of the post
+
+        Returns:
+            Dictionary with 'ancestors' and 'descendants' status lists
+        """
+        return self.client.status_context(post_id)
+
 
 def format_post_info(post: Dict[str, Any]) -> str:
     """
@@ -155,10 +241,7 @@ def format_post_info(post: Dict[str, Any]) -> str:
         Formatted string with post information
     """
     account = post['account']['acct']
-    content = post['content'].replace('<p>', '').replace('</p>', '\n').replace('<br />', '\n')
-    # Remove HTML tags
-    import re
-    content = re.sub('<[^<]+?>', '', content).strip()
+    content = status_text(post)
 
     created = post['created_at'].strftime("%Y-%m-%d %H:%M")
 
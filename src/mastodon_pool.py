@@ -0,0 +1,323 @@
+"""
+Mastodon Client Pool
+Publishes the same content to several Mastodon accounts/instances concurrently
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from mastodon_client import MastodonClient
+from tracing import span, traced, propagate
+
+
+class InstanceLimiter:
+    """Caps concurrency and request rate against a single Mastodon instance"""
+
+    def __init__(self, max_concurrent: int = 2, min_interval: float = 1.0):
+        """
+        Args:
+            max_concurrent: Maximum in-flight requests to this instance
+            min_interval: Minimum seconds between request starts
+        """
+        self.min_interval = min_interval
+        self._semaphore = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def __enter__(self):
+        self._semaphore.acquire()
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+        return self
+
+    def __exit__(self, *exc):
+        self._semaphore.release()
+        return False
+
+
+def load_accounts(accounts_file: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Load the list of publishing accounts
+
+    The file is a JSON list of objects with "name", "api_base_url" and either
+    "access_token" or "access_token_env" (name of an env var holding the token,
+    so secrets can stay in .env). Optional "visibility" overrides the default.
+
+    Args:
+        accounts_file: Path to the accounts file (default: MASTODON_ACCOUNTS_FILE
+            or mastodon_accounts.json)
+
+    Returns:
+        List of account dictionaries with resolved access tokens
+    """
+    path = Path(accounts_file or os.getenv('MASTODON_ACCOUNTS_FILE', 'mastodon_accounts.json'))
+
+    if not path.exists():
+        raise FileNotFoundError(f"Mastodon accounts file not found: {path}")
+
+    with open(path, 'r', encoding='utf-8') as f:
+        accounts = json.load(f)
+
+    if not accounts:
+        raise ValueError(f"No accounts configured in {path}")
+
+    resolved = []
+    names = set()
+    for i, account in enumerate(accounts):
+        name = account.get('name') or f"account{i + 1}"
+        if name in names:
+            raise ValueError(f"Account #{i + 1} in {path} reuses the name '{name}'")
+        names.add(name)
+
+        token = account.get('access_token')
+        if not token and account.get('access_token_env'):
+            token = os.getenv(account['access_token_env'])
+        if not token:
+            raise ValueError(f"Account #{i + 1} in {path} has no access token")
+
+        resolved.append({
+            'name': name,
+            'api_base_url': account.get('api_base_url', 'https://mastodon.social'),
+            'access_token': token,
+            'visibility': account.get('visibility', 'public'),
+        })
+
+    return resolved
+
+
+def has_accounts_file() -> bool:
+    """Whether a multi-account configuration is present"""
+    return Path(os.getenv('MASTODON_ACCOUNTS_FILE', 'mastodon_accounts.json')).exists()
+
+
+class MastodonClientPool:
+    """Pool of authenticated MastodonClients, one per configured account"""
+
+    def __init__(
+        self,
+        accounts: Optional[List[Dict[str, Any]]] = None,
+        max_concurrent_per_instance: int = None,
+        min_interval: float = None,
+        request_timeout: float = 30
+    ):
+        """
+        Connect to every configured account concurrently
+
+        Accounts on the same instance share one HTTP session (connection reuse)
+        and one rate limiter. Accounts that fail to authenticate are reported
+        in `self.errors` and skipped instead of failing the whole pool.
+
+        Args:
+            accounts: Account dictionaries (default: load_accounts())
+            max_concurrent_per_instance: In-flight requests allowed per instance
+                (default: MASTODON_INSTANCE_CONCURRENCY or 2)
+            min_interval: Seconds between requests to one instance
+                (default: MASTODON_INSTANCE_MIN_INTERVAL or 1.0)
+            request_timeout: Per-request timeout passed to Mastodon.py
+        """
+        if accounts is None:
+            accounts = load_accounts()
+        if max_concurrent_per_instance is None:
+            max_concurrent_per_instance = int(os.getenv('MASTODON_INSTANCE_CONCURRENCY', '2'))
+        if min_interval is None:
+            min_interval = float(os.getenv('MASTODON_INSTANCE_MIN_INTERVAL', '1.0'))
+
+        self.accounts = {account['name']: account for account in accounts}
+        if len(self.accounts) != len(accounts):
+            raise ValueError("Account names must be unique")
+        self.clients: Dict[str, MastodonClient] = {}
+        self.errors: Dict[str, str] = {}
+        self._sessions: Dict[str, requests.Session] = {}
+        self._limiters: Dict[str, InstanceLimiter] = {}
+
+        for account in accounts:
+            host = self._host(account)
+            if host not in self._sessions:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_maxsize=max(4, max_concurrent_per_instance))
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._sessions[host] = session
+                self._limiters[host] = InstanceLimiter(max_concurrent_per_instance, min_interval)
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, len(accounts)),
+            thread_name_prefix="mastodon-pool"
+        )
+
+        def connect(account):
+            host = self._host(account)
+            with self._limiters[host]:
+                return MastodonClient(
+                    access_token=account['access_token'],
+                    api_base_url=account['api_base_url'],
+                    session=self._sessions[host],
+                    ratelimit_method="throw",
+                    request_timeout=request_timeout
+                )
+
+        futures = {name: self._executor.submit(propagate(connect), account) for name, account in self.accounts.items()}
+        deadline = time.monotonic() + request_timeout
+        for name, future in futures.items():
+            try:
+                self.clients[name] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except Exception as e:
+                future.cancel()
+                self.errors[name] = str(e) or "timed out while connecting"
+                print(f"✗ Could not connect account '{name}': {e}")
+
+        print(f"✓ Connected {len(self.clients)}/{len(self.accounts)} Mastodon accounts")
+
+    @staticmethod
+    def _host(account: Dict[str, Any]) -> str:
+        return urlparse(account['api_base_url']).netloc or account['api_base_url']
+
+    def _run(self, name: str, fn) -> Dict[str, Any]:
+        account = self.accounts[name]
+        started = time.monotonic()
+        try:
+            with span("pool.account", account=name):
+                with self._limiters[self._host(account)]:
+                    status = fn(self.clients[name], account)
+            return {
+                'account': name,
+                'ok': True,
+                'status': status,
+                'url': status.get('url'),
+                'error': None,
+                'elapsed': time.monotonic() - started,
+            }
+        except Exception as e:
+            return {
+                'account': name,
+                'ok': False,
+                'status': None,
+                'url': None,
+                'error': str(e),
+                'elapsed': time.monotonic() - started,
+            }
+
+    def _fan_out(self, fn, timeout: float, skip=()) -> Dict[str, Dict[str, Any]]:
+        started = time.monotonic()
+        futures = {
+            self._executor.submit(propagate(self._run), name, fn): name
+            for name in self.clients
+            if name not in skip
+        }
+        done, pending = wait(futures, timeout=timeout)
+
+        results = {}
+        for future in done:
+            result = future.result()
+            results[result['account']] = result
+        for future in pending:
+            # The request keeps running in its worker until request_timeout,
+            # but we stop waiting for it so other accounts aren't held up
+            future.cancel()
+            name = futures[future]
+            results[name] = {
+                'account': name,
+                'ok': False,
+                'status': None,
+                'url': None,
+                'error': f"timed out after {timeout:.0f}s",
+                'elapsed': time.monotonic() - started,
+            }
+        for name, error in self.errors.items():
+            if name in skip:
+                continue
+            results[name] = {
+                'account': name,
+                'ok': False,
+                'status': None,
+                'url': None,
+                'error': f"not connected: {error}",
+                'elapsed': 0.0,
+            }
+
+        ok = sum(1 for r in results.values() if r['ok'])
+        print(f"✓ Published to {ok}/{len(self.accounts) - len(skip)} accounts")
+        return results
+
+    @traced("pool.publish")
+    def publish(
+        self,
+        content: str,
+        visibility: Optional[str] = None,
+        timeout: float = 60,
+        idempotency_key: Optional[str] = None,
+        skip=()
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Post the same status to every connected account concurrently
+
+        Args:
+            content: The text content to post
+            visibility: Visibility override (default: each account's setting)
+            timeout: Seconds to wait for all accounts before giving up on stragglers
+            idempotency_key: Optional base key; each account gets "<key>-<name>"
+            skip: Account names to leave out (e.g. already published)
+
+        Returns:
+            Dictionary mapping account name to a result dict with keys
+            ok, status, url, error and elapsed
+        """
+        def post(client, account):
+            return client.post(
+                content,
+                visibility=visibility or account['visibility'],
+                idempotency_key=f"{idempotency_key}-{account['name']}" if idempotency_key else None
+            )
+
+        return self._fan_out(post, timeout, skip)
+
+    def close(self):
+        """
+        Shut down worker threads and HTTP sessions
+
+        Stragglers that _fan_out stopped waiting for still use the shared
+        sessions, so this waits for them (at most request_timeout) before
+        closing the sessions.
+        """
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        for session in self._sessions.values():
+            session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def format_publish_results(results: Dict[str, Dict[str, Any]]) -> str:
+    """
+    Format per-account publish results for display or notification
+
+    Args:
+        results: Output of MastodonClientPool.publish
+
+    Returns:
+        One line per account
+    """
+    lines = []
+    for name, result in sorted(results.items()):
+        if result['ok']:
+            lines.append(f"✅ {name}: {result['url']} ({result['elapsed']:.1f}s)")
+        else:
+            lines.append(f"❌ {name}: {result['error']}")
+    return "\n".join(lines)
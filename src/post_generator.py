@@ -5,6 +5,8 @@ Uses OpenAI's GPT with structured outputs to generate brand-aligned social media
 
 from openai import OpenAI
 from pydantic import BaseModel, Field
+from llm_hedging import parse_completion
+from tracing import traced
 import os
 from pathlib import Path
 from typing import Literal
@@ -19,6 +21,7 @@ class SocialMediaPost(BaseModel):
     call_to_action: str | None = Field(description="Optional call-to-action. For Mastodon, skip this to save characters.")
 
 
+@traced("posts.load_company_docs")
 def load_company_docs(docs_dir: str = "company_docs") -> dict[str, str]:
     """
     Load all company documentation files from the specified directory
@@ -75,11 +78,13 @@ def create_llm_client() -> OpenAI:
         return OpenAI(api_key=api_key)
 
 
+@traced("posts.generate_post")
 def generate_post(
     company_docs: dict[str, str],
     post_type: str = "thought_leadership",
     platform: str = "mastodon",
-    model: str = "openai/gpt-4o-mini" 
+    model: str = "openai/gpt-4o-mini",
+    feedback: str | None = None
 ) -> SocialMediaPost:
     """
     Generate a social media post using LLMs with structured outputs
@@ -89,6 +94,7 @@ def generate_post(
         post_type: Type of post to generate (thought_leadership, customer_story, etc.)
         platform: Target platform (linkedin, twitter, mastodon)
         model: OpenRouter model to use (openai/gpt-4o-mini is cheap and good)
+        feedback: Optional problems with a previous draft that the new one must avoid
 
     Returns:
         SocialMediaPost object with structured content
@@ -142,9 +148,16 @@ Post type focus:
 - product_update: Explain a specific feature or capability
 - industry_insight: Comment on retail industry trends or news"""
 
+    if feedback:
+        user_prompt += f"""
+
+A previous draft was rejected by our brand-voice checks. Avoid these problems:
+{feedback}"""
+
     print(f"Generating {post_type} post for {platform} using {model}...")
 
-    response = client.beta.chat.completions.parse(
+    response = parse_completion(
+        client,
         model=model,
         messages=[
             {"role": "system", "content": system_prompt},
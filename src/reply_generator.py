@@ -5,9 +5,12 @@ Uses OpenAI's GPT with structured outputs to generate thoughtful replies to rele
 
 from openai import OpenAI
 from pydantic import BaseModel, Field
+from llm_hedging import parse_completion
+from html_text import html_to_text, statuses_text
+from tracing import traced
 import os
-from typing import List, Dict, Any
-import re
+from typing import List, Dict, Any, Tuple
+import time
 
 
 class Reply(BaseModel):
@@ -24,6 +27,29 @@ class BatchReplies(BaseModel):
     replies: List[Reply] = Field(description="List of potential replies to posts")
 
 
+class RelevanceScore(BaseModel):
+    """Schema for scoring a single post (cascade stage 1)"""
+    post_id: str = Field(description="ID of the post being scored")
+    relevance_score: int = Field(description="How relevant this post is to our company (1-10)")
+    should_reply: bool = Field(description="Whether we could add genuine value by replying")
+
+
+class BatchScores(BaseModel):
+    """Schema for batch relevance scoring"""
+    scores: List[RelevanceScore] = Field(description="Relevance score for every post")
+
+
+class StageMetrics(BaseModel):
+    """Metrics for one stage of the reply cascade"""
+    stage: str
+    model: str
+    posts_in: int
+    posts_out: int
+    latency_seconds: float
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+
 def create_llm_client() -> OpenAI:
     """
     Create OpenAI client (supports both direct OpenAI and OpenRouter)
@@ -53,51 +79,33 @@ def create_llm_client() -> OpenAI:
         return OpenAI(api_key=api_key)
 
 
+@traced("replies.clean_html")
 def clean_html(html_content: str) -> str:
     """
     Remove HTML tags from content
 
+    For status dictionaries prefer html_text.status_text, which is memoized.
+
     Args:
         html_content: HTML string
 
     Returns:
         Plain text string
     """
-    # Replace common HTML elements
-    text = html_content.replace('<p>', '').replace('</p>', '\n')
-    text = text.replace('<br />', '\n').replace('<br>', '\n')
-
-    # Remove all HTML tags
-    text = re.sub('<[^<]+?>', '', text)
-
-    # Clean up whitespace
-    text = re.sub(r'\n\s*\n', '\n\n', text)
-    return text.strip()
+    return html_to_text(html_content)
 
 
-def generate_replies(
-    company_docs: Dict[str, str],
-    posts: List[Dict[str, Any]],
-    min_relevance: int = 5,
-    model: str = "openai/gpt-4o-mini",
-    own_account_id: str = None
-) -> List[Reply]:
+def build_company_summary(company_docs: Dict[str, str]) -> str:
     """
-    Generate replies to multiple posts at once using structured outputs
+    Build the abbreviated company context used in reply prompts
 
     Args:
         company_docs: Dictionary of company documentation
-        posts: List of post dictionaries from Mastodon
-        min_relevance: Minimum relevance score to actually reply (1-10)
-        model: OpenRouter model to use
 
     Returns:
-        List of Reply objects
+        Short company summary with brand voice notes
     """
-    client = create_llm_client()
-
-    # Prepare company context (abbreviated)
-    company_summary = f"""
+    return f"""
 Company: InventoryVision AI
 
 Overview: {company_docs.get('01_company_overview', '')[:800]}
@@ -106,16 +114,28 @@ Brand Voice: Professional but approachable. We're experts in computer vision and
 but we're humble and focus on providing genuine value. We don't spam or oversell.
 """
 
-    # Prepare posts for analysis
+
+def format_posts_for_prompt(
+    posts: List[Dict[str, Any]],
+    thread_contexts: Dict[str, str] = None,
+    max_chars: int = 500
+) -> str:
+    """
+    Format posts (and their thread summaries) for an LLM prompt
+
+    Args:
+        posts: List of post dictionaries from Mastodon
+        thread_contexts: Optional map of post ID to thread summary
+        max_chars: Maximum characters of each post's content to include
+
+    Returns:
+        Prompt text describing every post
+    """
     posts_text = ""
-    post_map = {}  # Map for easy lookup
 
-    for i, post in enumerate(posts):
+    for post, content in zip(posts, statuses_text(posts)):
         post_id = post['id']
-        post_map[post_id] = post
-
         author = post['account']['acct']
-        content = clean_html(post['content'])
         created = post['created_at'].strftime("%Y-%m-%d %H:%M")
 
         posts_text += f"""
@@ -124,9 +144,47 @@ POST ID: {post_id}
 Author: @{author}
 Created: {created}
 Content:
-{content[:500]}
----
+{content[:max_chars]}
+"""
+        thread = (thread_contexts or {}).get(str(post_id))
+        if thread:
+            posts_text += f"""Thread context:
+{thread}
 """
+        posts_text += "---\n"
+
+    return posts_text
+
+
+@traced("replies.generate_replies")
+def generate_replies(
+    company_docs: Dict[str, str],
+    posts: List[Dict[str, Any]],
+    min_relevance: int = 5,
+    model: str = "openai/gpt-4o-mini",
+    own_account_id: str = None,
+    thread_contexts: Dict[str, str] = None,
+    feedback: str = None
+) -> List[Reply]:
+    """
+    Generate replies to multiple posts at once using structured outputs
+
+    Args:
+        company_docs: Dictionary of company documentation
+        posts: List of post dictionaries from Mastodon
+        min_relevance: Minimum relevance score to actually reply (1-10)
+        model: OpenRouter model to use
+        thread_contexts: Optional map of post ID to thread summary
+            (see thread_context.build_thread_summaries)
+        feedback: Optional problems with previous drafts that new replies must avoid
+
+    Returns:
+        List of Reply objects
+    """
+    client = create_llm_client()
+
+    company_summary = build_company_summary(company_docs)
+    posts_text = format_posts_for_prompt(posts, thread_contexts)
 
     system_prompt = """You are a social media engagement specialist for InventoryVision AI.
 Your job is to identify relevant posts and generate thoughtful, valuable replies.
@@ -157,7 +215,7 @@ Don't reply when:
 Analyze these posts and generate appropriate replies:
 {posts_text}
 
-For each post:
+For each post (use the thread context, when given, to understand the conversation):
 1. Assess its relevance to our company and expertise (1-10 score)
 2. Determine if we should reply (only if we can add genuine value)
 3. If yes, write a brief, helpful reply (1-3 sentences)
@@ -165,9 +223,16 @@ For each post:
 
 Focus on building authentic connections, not just promotion."""
 
+    if feedback:
+        user_prompt += f"""
+
+Previous drafts were rejected by our brand-voice checks. Avoid these problems:
+{feedback}"""
+
     print(f"Analyzing {len(posts)} posts for reply opportunities...")
 
-    response = client.beta.chat.completions.parse(
+    response = parse_completion(
+        client,
         model=model,
         messages=[
             {"role": "system", "content": system_prompt},
@@ -191,6 +256,239 @@ Focus on building authentic connections, not just promotion."""
     return relevant_replies
 
 
+def _stage_metrics(stage: str, model: str, posts_in: int, posts_out: int, started: float, response=None) -> StageMetrics:
+    usage = getattr(response, 'usage', None)
+    return StageMetrics(
+        stage=stage,
+        model=model,
+        posts_in=posts_in,
+        posts_out=posts_out,
+        latency_seconds=round(time.monotonic() - started, 3),
+        prompt_tokens=getattr(usage, 'prompt_tokens', 0) or 0,
+        completion_tokens=getattr(usage, 'completion_tokens', 0) or 0,
+    )
+
+
+@traced("replies.score_posts")
+def score_posts(
+    company_docs: Dict[str, str],
+    posts: List[Dict[str, Any]],
+    model: str = "openai/gpt-4o-mini",
+    thread_contexts: Dict[str, str] = None
+) -> Tuple[List[RelevanceScore], StageMetrics]:
+    """
+    Score relevance for a batch of posts without writing any replies
+
+    This is the cheap first stage of the reply cascade: the output is a few
+    tokens per post, so a small fast model is enough.
+
+    Args:
+        company_docs: Dictionary of company documentation
+        posts: List of post dictionaries from Mastodon
+        model: Model used for scoring
+        thread_contexts: Optional map of post ID to thread summary
+
+    Returns:
+        Tuple of (scores, stage metrics)
+    """
+    started = time.monotonic()
+    client = create_llm_client()
+
+    system_prompt = """You are a relevance filter for InventoryVision AI's social media team.
+Score each post for how relevant it is to retail technology, inventory management,
+computer vision and related topics (1-10), and say whether a brief, genuinely helpful
+reply from us would add value. Do not write replies."""
+
+    user_prompt = f"""Company Context:
+{build_company_summary(company_docs)}
+
+Score these posts:
+{format_posts_for_prompt(posts, thread_contexts, max_chars=300)}"""
+
+    print(f"[score] Scoring {len(posts)} posts with {model}...")
+
+    response = parse_completion(
+        client,
+        model=model,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        response_format=BatchScores,
+    )
+
+    scores = response.choices[0].message.parsed.scores
+    return scores, _stage_metrics("score", model, len(posts), len(scores), started, response)
+
+
+@traced("replies.write_replies")
+def write_replies(
+    company_docs: Dict[str, str],
+    posts: List[Dict[str, Any]],
+    scores: Dict[str, RelevanceScore],
+    model: str = None,
+    thread_contexts: Dict[str, str] = None,
+    feedback: str = None
+) -> Tuple[List[Reply], StageMetrics]:
+    """
+    Write replies for posts that already passed relevance scoring
+
+    This is the second stage of the reply cascade. It sees more of each
+    post plus the full company overview, so a stronger model pays off here.
+
+    Args:
+        company_docs: Dictionary of company documentation
+        posts: Posts that passed the scoring stage
+        scores: Stage 1 scores keyed by post ID
+        model: Model used for writing (default: REPLY_WRITE_MODEL or openai/gpt-4o)
+        thread_contexts: Optional map of post ID to thread summary
+        feedback: Optional problems with previous drafts that new replies must avoid
+
+    Returns:
+        Tuple of (replies, stage metrics)
+    """
+    model = model or os.getenv('REPLY_WRITE_MODEL', 'openai/gpt-4o')
+    started = time.monotonic()
+    client = create_llm_client()
+
+    system_prompt = """You are a social media engagement specialist for InventoryVision AI.
+These posts have already been judged relevant. Write a thoughtful reply for each one.
+
+Guidelines for replies:
+1. Add genuine value to the conversation - share an insight or ask a thoughtful question
+2. Don't be salesy or promotional - be helpful and authentic
+3. Keep replies brief (1-3 sentences)
+4. Be professional but friendly
+5. If on closer reading we can't add value, set should_reply=False
+"""
+
+    score_notes = "\n".join(
+        f"- {post['id']}: relevance {scores[str(post['id'])].relevance_score}/10"
+        for post in posts
+    )
+
+    user_prompt = f"""Company Context:
+{build_company_summary(company_docs)}
+
+Company Overview (full):
+{company_docs.get('01_company_overview', '')[:3000]}
+
+Relevance scores from screening:
+{score_notes}
+
+Write replies for these posts:
+{format_posts_for_prompt(posts, thread_contexts, max_chars=1500)}
+
+For each post, keep the given relevance score, write the reply and explain your reasoning."""
+
+    if feedback:
+        user_prompt += f"""
+
+Previous drafts were rejected by our brand-voice checks. Avoid these problems:
+{feedback}"""
+
+    print(f"[write] Writing replies for {len(posts)} posts with {model}...")
+
+    response = parse_completion(
+        client,
+        model=model,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        response_format=BatchReplies,
+    )
+
+    # Only posts that passed screening get a reply, one each; screening
+    # scores are authoritative and the writer only decides the wording
+    written = {}
+    for reply in response.choices[0].message.parsed.replies:
+        post_id = str(reply.post_id)
+        if post_id not in scores:
+            print(f"⚠️  [write] Dropping reply to unexpected post {post_id}")
+            continue
+        if post_id in written:
+            print(f"⚠️  [write] Dropping duplicate reply to post {post_id}")
+            continue
+        reply.post_id = post_id
+        reply.relevance_score = scores[post_id].relevance_score
+        written[post_id] = reply
+    replies = list(written.values())
+
+    missing = [str(post['id']) for post in posts if str(post['id']) not in written]
+    if missing:
+        print(f"⚠️  [write] No reply written for {len(missing)} passing posts: {', '.join(missing)}")
+
+    return replies, _stage_metrics("write", model, len(posts), len(replies), started, response)
+
+
+@traced("replies.generate_replies_cascade")
+def generate_replies_cascade(
+    company_docs: Dict[str, str],
+    posts: List[Dict[str, Any]],
+    min_relevance: int = 5,
+    score_model: str = None,
+    reply_model: str = None,
+    thread_contexts: Dict[str, str] = None
+) -> Tuple[List[Reply], List[StageMetrics]]:
+    """
+    Generate replies with a two-stage model cascade
+
+    A cheap model scores every post; only posts that meet min_relevance and
+    are worth replying to go to the (possibly stronger) reply model.
+
+    Args:
+        company_docs: Dictionary of company documentation
+        posts: List of post dictionaries from Mastodon
+        min_relevance: Minimum relevance score to pass screening (1-10)
+        score_model: Stage 1 model (default: REPLY_SCORE_MODEL or openai/gpt-4o-mini)
+        reply_model: Stage 2 model (default: REPLY_WRITE_MODEL or openai/gpt-4o)
+        thread_contexts: Optional map of post ID to thread summary
+
+    Returns:
+        Tuple of (replies meeting the threshold, metrics for each stage run)
+    """
+    score_model = score_model or os.getenv('REPLY_SCORE_MODEL', 'openai/gpt-4o-mini')
+    reply_model = reply_model or os.getenv('REPLY_WRITE_MODEL', 'openai/gpt-4o')
+
+    print(f"Analyzing {len(posts)} posts for reply opportunities (cascade)...")
+
+    scores, score_metrics = score_posts(company_docs, posts, score_model, thread_contexts)
+    metrics = [score_metrics]
+
+    passing = {
+        score.post_id: score for score in scores
+        if score.relevance_score >= min_relevance and score.should_reply
+    }
+    candidates = [post for post in posts if str(post['id']) in passing]
+
+    print(f"✓ {len(candidates)}/{len(posts)} posts passed screening ({min_relevance}/10)")
+
+    replies = []
+    if candidates:
+        replies, write_metrics = write_replies(
+            company_docs, candidates, passing, reply_model, thread_contexts
+        )
+        metrics.append(write_metrics)
+
+    print(f"✓ {sum(1 for r in replies if r.should_reply)} recommended to post")
+    display_stage_metrics(metrics)
+
+    return replies, metrics
+
+
+def display_stage_metrics(metrics: List[StageMetrics]):
+    """
+    Display per-stage cascade metrics
+
+    Args:
+        metrics: List of StageMetrics objects
+    """
+    for m in metrics:
+        print(f"   [{m.stage}] {m.model}: {m.posts_in} in → {m.posts_out} out, "
+              f"{m.latency_seconds:.2f}s, {m.prompt_tokens}+{m.completion_tokens} tokens")
+
+
 def display_reply_plan(replies: List[Reply]):
     """
     Display a summary of the reply plan
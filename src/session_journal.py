@@ -0,0 +1,162 @@
+"""
+Session Journal
+Write-ahead journal that lets post and reply sessions resume after a crash
+
+Each step (search results, generated content, approval decisions, posted
+status IDs) is appended to a JSONL file and fsynced before the session moves
+on. A rerun with the same parameters replays the journal and continues from
+the last completed step instead of starting over.
+
+Unfinished sessions older than JOURNAL_MAX_AGE seconds (default 3600, about
+how long Mastodon honours an Idempotency-Key) are abandoned rather than
+resumed. That way stale searches and drafts aren't replayed, and a resumed
+post is never sent with an idempotency key the server has already
+forgotten.
+"""
+
+import hashlib
+import json
+import os
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _decode(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1 and "$datetime" in obj:
+        return datetime.fromisoformat(obj["$datetime"])
+    return obj
+
+
+class SessionJournal:
+    """Append-only journal for one post/reply session"""
+
+    def __init__(
+        self,
+        session_key: str,
+        journal_dir: Optional[str] = None,
+        fresh: bool = False,
+        max_age: Optional[float] = None
+    ):
+        """
+        Open the journal for a session, resuming it if it wasn't completed
+
+        Args:
+            session_key: Identifies the session's parameters, e.g. "reply:retail:5"
+            journal_dir: Directory for journal files (default: JOURNAL_DIR or .state/journal)
+            fresh: Discard any unfinished journal and start a new session
+            max_age: Seconds after which an unfinished session is abandoned
+                instead of resumed (default: JOURNAL_MAX_AGE or 3600; 0 disables)
+        """
+        if max_age is None:
+            max_age = float(os.getenv('JOURNAL_MAX_AGE', '3600'))
+        self.session_key = session_key
+        directory = Path(journal_dir or os.getenv('JOURNAL_DIR', '.state/journal'))
+        directory.mkdir(parents=True, exist_ok=True)
+
+        digest = hashlib.sha1(session_key.encode('utf-8')).hexdigest()[:12]
+        self.path = directory / f"{digest}.jsonl"
+        self.entries: List[Dict[str, Any]] = []
+
+        if self.path.exists() and fresh:
+            self._archive("abandoned")
+
+        if self.path.exists():
+            good_bytes = 0
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    try:
+                        self.entries.append(json.loads(line.decode('utf-8'), object_hook=_decode))
+                    except ValueError:
+                        # A crash mid-write can leave a torn last line; drop it
+                        # so entries appended from now on stay readable
+                        break
+                    good_bytes += len(line)
+            if good_bytes < self.path.stat().st_size:
+                os.truncate(self.path, good_bytes)
+
+        if self.entries and max_age and time.time() - self.entries[0]["ts"] > max_age:
+            age_minutes = (time.time() - self.entries[0]["ts"]) / 60
+            print(f"⌛ Unfinished session is {age_minutes:.0f} minutes old, starting a new one")
+            self.entries = []
+            self._archive("abandoned")
+
+        self.resumed = bool(self.entries)
+        if self.resumed:
+            self.session_id = self.entries[0]["data"]["session_id"]
+            print(f"↻ Resuming unfinished session {self.session_id} ({len(self.entries)} journal entries)")
+        else:
+            self.session_id = uuid.uuid4().hex[:12]
+            self.record("start", session_id=self.session_id, session_key=session_key)
+
+    def record(self, step: str, **data):
+        """
+        Durably append a step to the journal
+
+        Args:
+            step: Step name, e.g. "search", "approval", "posted"
+            **data: JSON-serializable step data (datetimes are supported)
+        """
+        entry = {"step": step, "ts": time.time(), "data": data}
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, default=_encode) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.entries.append(entry)
+
+    def get(self, step: str, **match) -> Optional[Dict[str, Any]]:
+        """
+        Get the data of the latest entry for a step
+
+        Args:
+            step: Step name
+            **match: Only consider entries whose data has these values
+
+        Returns:
+            The entry's data, or None if the step hasn't been recorded
+        """
+        for entry in reversed(self.entries):
+            if entry["step"] == step and all(entry["data"].get(k) == v for k, v in match.items()):
+                return entry["data"]
+        return None
+
+    def all(self, step: str) -> List[Dict[str, Any]]:
+        """
+        Get the data of every entry for a step, oldest first
+
+        Args:
+            step: Step name
+
+        Returns:
+            List of entry data dictionaries
+        """
+        return [entry["data"] for entry in self.entries if entry["step"] == step]
+
+    def idempotency_key(self, *parts: str) -> str:
+        """
+        Stable key for a side effect in this session (same across restarts)
+
+        Args:
+            *parts: Values identifying the side effect, e.g. a post ID
+
+        Returns:
+            Key suitable for Mastodon's Idempotency-Key header
+        """
+        return "-".join([self.session_id, *[str(p) for p in parts]])
+
+    def complete(self):
+        """Mark the session finished so the next run starts fresh"""
+        self.record("complete")
+        self._archive("done")
+
+    def _archive(self, suffix: str):
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.path.rename(self.path.with_name(f"{self.path.stem}.{stamp}.{suffix}"))
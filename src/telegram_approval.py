@@ -8,6 +8,7 @@ import asyncio
 from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import Application, CallbackQueryHandler, ContextTypes
 from dotenv import load_dotenv
+from tracing import traced
 
 load_dotenv()
 
@@ -25,8 +26,10 @@ class TelegramApprovalBot:
         self.bot = Bot(token=self.token)
         self.approval_received = False
         self.user_approved = False
+        self.timed_out = False
         self.current_message_id = None  # Track which message we're waiting for
 
+    @traced("telegram.approval_wait")
     async def send_approval_request(self, content: str, content_type: str = "post") -> bool:
         """
         Send approval request with buttons and wait for response.
@@ -113,6 +116,7 @@ class TelegramApprovalBot:
         # Check result
         if not self.approval_received:
             print("⏱️ Timeout - no response received after 5 minutes")
+            self.timed_out = True
             return False
 
         if self.user_approved:
@@ -158,6 +162,7 @@ class TelegramApprovalBot:
             # If message edit fails (e.g., already edited), just continue
             pass
 
+    @traced("telegram.send_notification")
     async def send_notification(self, message: str):
         """Send a simple notification (no markdown parsing)."""
         await self.bot.send_message(
@@ -181,6 +186,22 @@ def request_approval(content: str, content_type: str = "post") -> bool:
     return asyncio.run(bot.send_approval_request(content, content_type))
 
 
+def request_approval_decision(content: str, content_type: str = "post") -> bool | None:
+    """
+    Request approval, distinguishing a timeout from a rejection.
+
+    Args:
+        content: The content to approve
+        content_type: "post" or "reply"
+
+    Returns:
+        True if approved, False if rejected, None if nobody responded in time
+    """
+    bot = TelegramApprovalBot()
+    approved = asyncio.run(bot.send_approval_request(content, content_type))
+    return None if bot.timed_out else approved
+
+
 def send_notification(message: str):
     """Send notification to Telegram (synchronous wrapper)."""
     bot = TelegramApprovalBot()
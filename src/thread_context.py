@@ -0,0 +1,291 @@
+"""
+Thread Context
+Concurrently fetches and caches the conversation around candidate posts,
+and condenses it into a short, token-budgeted summary for reply prompts
+
+Contexts are cached on disk (.state/thread_contexts.json) for
+THREAD_CONTEXT_TTL seconds, so reruns within that window skip the fetch.
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+from html_text import statuses_text
+from tracing import traced, propagate
+
+
+class TTLCache:
+    """Thread-safe cache whose entries expire after a fixed time, optionally persisted to a JSON file"""
+
+    def __init__(self, ttl: float = 600, path: Optional[str] = None):
+        """
+        Args:
+            ttl: Seconds an entry stays valid
+            path: JSON file to load from and save to (None: memory only)
+        """
+        self.ttl = ttl
+        self.path = Path(path) if path else None
+        self._data: Dict[str, list] = {}
+        self._loaded = self.path is None
+        self._lock = threading.Lock()
+
+    def _load_locked(self):
+        # Loaded on first use so importing the module does no file I/O
+        self._loaded = True
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._data = json.load(f)
+        except (OSError, ValueError):
+            self._data = {}
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if not self._loaded:
+                self._load_locked()
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            stored, value = entry
+            if stored + self.ttl < time.time():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            if not self._loaded:
+                self._load_locked()
+            # Store the fetch time, so a changed TTL applies to existing entries
+            self._data[key] = [time.time(), value]
+
+    def save(self):
+        """Write unexpired entries to the cache file (atomic)"""
+        if self.path is None:
+            return
+        with self._lock:
+            cutoff = time.time() - self.ttl
+            self._data = {k: e for k, e in self._data.items() if e[0] >= cutoff}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix('.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f)
+            tmp.replace(self.path)
+
+    def __len__(self):
+        return len(self._data)
+
+
+# Shared across calls and, through the cache file, across runs
+_context_cache = TTLCache(
+    ttl=float(os.getenv('THREAD_CONTEXT_TTL', '600')),
+    path=os.getenv('THREAD_CONTEXT_CACHE_FILE', '.state/thread_contexts.json')
+)
+
+
+def _slim_status(status: Dict[str, Any]) -> Dict[str, Any]:
+    # Only what summarize_thread reads, so the cache file stays small and JSON-safe
+    return {
+        'id': str(status['id']),
+        'content': status.get('content') or '',
+        'account': {'acct': status['account']['acct']},
+        'in_reply_to_id': str(status['in_reply_to_id']) if status.get('in_reply_to_id') else None,
+        'favourites_count': status.get('favourites_count', 0),
+        'edited_at': str(status['edited_at']) if status.get('edited_at') else None,
+    }
+
+
+def _slim_context(context: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'ancestors': [_slim_status(s) for s in context.get('ancestors') or []],
+        'descendants': [_slim_status(s) for s in context.get('descendants') or []],
+    }
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English text)"""
+    return (len(text) + 3) // 4
+
+
+@traced("threads.fetch_thread_contexts")
+def fetch_thread_contexts(
+    mastodon,
+    posts: List[Dict[str, Any]],
+    max_workers: int = 8,
+    cache: Optional[TTLCache] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch ancestors and descendants for many posts concurrently
+
+    Cached contexts (in memory and in the cache file) are reused; only
+    misses go to the API. A post whose context can't be fetched is simply
+    left out of the result. Contexts are reduced to the fields used for
+    summaries.
+
+    Args:
+        mastodon: MastodonClient instance
+        posts: List of post dictionaries from Mastodon
+        max_workers: Maximum concurrent context requests
+        cache: Cache to use (default: module-level cache backed by
+            THREAD_CONTEXT_CACHE_FILE or .state/thread_contexts.json)
+
+    Returns:
+        Dictionary mapping post ID to its context ('ancestors', 'descendants')
+    """
+    cache = cache if cache is not None else _context_cache
+    contexts = {}
+    missing = []
+
+    for post in posts:
+        post_id = str(post['id'])
+        cached = cache.get(post_id)
+        if cached is not None:
+            contexts[post_id] = cached
+        else:
+            missing.append(post_id)
+
+    if missing:
+        def fetch(post_id):
+            try:
+                return post_id, mastodon.get_status_context(post_id)
+            except Exception as e:
+                print(f"⚠️  Could not fetch thread for post {post_id}: {e}")
+                return post_id, None
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(missing))) as executor:
+            for post_id, context in executor.map(propagate(fetch), missing):
+                if context is not None:
+                    context = _slim_context(context)
+                    cache.set(post_id, context)
+                    contexts[post_id] = context
+
+        try:
+            cache.save()
+        except OSError as e:
+            print(f"⚠️  Could not save thread context cache: {e}")
+
+    print(f"✓ Thread context for {len(contexts)}/{len(posts)} posts "
+          f"({len(posts) - len(missing)} cached, {len(missing)} fetched)")
+    return contexts
+
+
+def summarize_thread(
+    post: Dict[str, Any],
+    context: Dict[str, Any],
+    token_budget: int = 300,
+    max_chars_per_status: int = 280
+) -> str:
+    """
+    Condense a thread into a summary that fits a token budget
+
+    The root post and the direct parent are kept first, then the nearest
+    other ancestors, then replies to the post (most favourited first).
+    Output stays in conversation order.
+
+    Args:
+        post: The post being considered for a reply
+        context: Its context from fetch_thread_contexts
+        token_budget: Approximate maximum tokens for the summary
+        max_chars_per_status: Truncation length for each status
+
+    Returns:
+        Summary text, or an empty string if there is no surrounding thread
+    """
+    ancestors = list(context.get('ancestors') or [])
+    descendants = list(context.get('descendants') or [])
+    if not ancestors and not descendants:
+        return ""
+
+    post_id = str(post['id'])
+    texts = dict(zip((str(s['id']) for s in ancestors + descendants), statuses_text(ancestors + descendants)))
+
+    def line(status):
+        text = texts[str(status['id'])].replace('\n', ' ')
+        if len(text) > max_chars_per_status:
+            text = text[:max_chars_per_status].rstrip() + "…"
+        return f"@{status['account']['acct']}: {text}"
+
+    # Priority order: root, parent, nearer ancestors, then replies
+    ancestor_order = []
+    if ancestors:
+        ancestor_order.append(0)
+        if len(ancestors) > 1:
+            ancestor_order.append(len(ancestors) - 1)
+        ancestor_order.extend(range(len(ancestors) - 2, 0, -1))
+
+    direct = [d for d in descendants if str(d.get('in_reply_to_id')) == post_id]
+    indirect = [d for d in descendants if str(d.get('in_reply_to_id')) != post_id]
+    reply_order = sorted(direct, key=lambda s: s.get('favourites_count', 0), reverse=True)
+    reply_order += sorted(indirect, key=lambda s: s.get('favourites_count', 0), reverse=True)
+
+    used = 0
+    kept_ancestors = set()
+    kept_replies = []
+
+    for index in ancestor_order:
+        cost = estimate_tokens(line(ancestors[index]))
+        if used + cost > token_budget:
+            break
+        kept_ancestors.add(index)
+        used += cost
+
+    for status in reply_order:
+        cost = estimate_tokens(line(status))
+        if used + cost > token_budget:
+            break
+        kept_replies.append(status)
+        used += cost
+
+    parts = []
+    if kept_ancestors:
+        parts.append("Earlier in thread:")
+        previous = -1
+        for index in sorted(kept_ancestors):
+            if index - previous > 1:
+                parts.append("  …")
+            parts.append(f"  {line(ancestors[index])}")
+            previous = index
+    if kept_replies:
+        shown = {id(s) for s in kept_replies}
+        parts.append(f"Replies so far ({len(descendants)} total):")
+        parts.extend(f"  {line(s)}" for s in descendants if id(s) in shown)
+
+    return "\n".join(parts)
+
+
+@traced("threads.build_thread_summaries")
+def build_thread_summaries(
+    mastodon,
+    posts: List[Dict[str, Any]],
+    token_budget: Optional[int] = None
+) -> Dict[str, str]:
+    """
+    Fetch thread context for posts and summarize each one
+
+    Args:
+        mastodon: MastodonClient instance
+        posts: List of post dictionaries from Mastodon
+        token_budget: Tokens per thread summary (default: THREAD_CONTEXT_TOKENS or 300)
+
+    Returns:
+        Dictionary mapping post ID to its thread summary (posts without a
+        surrounding thread are omitted)
+    """
+    if token_budget is None:
+        token_budget = int(os.getenv('THREAD_CONTEXT_TOKENS', '300'))
+
+    contexts = fetch_thread_contexts(mastodon, posts)
+    summaries = {}
+    for post in posts:
+        post_id = str(post['id'])
+        if post_id in contexts:
+            summary = summarize_thread(post, contexts[post_id], token_budget)
+            if summary:
+                summaries[post_id] = summary
+    return summaries
@@ -0,0 +1,187 @@
+"""
+Trace Report
+Per-stage latency breakdowns, critical paths and a flame-style tree built
+from spans recorded by tracing.py
+"""
+
+from collections import defaultdict
+from typing import List, Dict, Any, Optional
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def group_traces(spans: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Group spans by trace (one trace per CLI run)
+
+    Args:
+        spans: Spans from tracing.load_spans
+
+    Returns:
+        Dictionary mapping trace ID to its spans
+    """
+    traces = defaultdict(list)
+    for s in spans:
+        s.setdefault("end", s["start"] + s["duration_ms"] / 1000)
+        traces[s["trace_id"]].append(s)
+    return dict(traces)
+
+
+def _children(spans: List[Dict[str, Any]]):
+    ids = {s["span_id"] for s in spans}
+    children = defaultdict(list)
+    roots = []
+    for s in spans:
+        if s["parent_id"] and s["parent_id"] in ids:
+            children[s["parent_id"]].append(s)
+        else:
+            roots.append(s)
+    return roots, children
+
+
+def critical_path(span: Dict[str, Any], children, end: Optional[float] = None) -> List[tuple]:
+    """
+    Walk a span tree backwards from its end to find what the run waited on
+
+    At every level the child that finished last is on the critical path;
+    time not covered by any child counts as the parent's own work.
+
+    Args:
+        span: Root span
+        children: Map of span ID to child spans
+        end: Clip the span at this time (used for recursion)
+
+    Returns:
+        List of (stage name, seconds on the critical path)
+    """
+    cursor = span["end"] if end is None else min(span["end"], end)
+    contributions = []
+
+    for child in sorted(children.get(span["span_id"], []), key=lambda c: c["end"], reverse=True):
+        if child["start"] >= cursor:
+            continue  # Ran in parallel with a child already on the path
+        child_end = min(child["end"], cursor)
+        contributions.append((span["name"], cursor - child_end))
+        contributions.extend(critical_path(child, children, child_end))
+        cursor = max(child["start"], span["start"])
+
+    contributions.append((span["name"], max(0.0, cursor - span["start"])))
+    return contributions
+
+
+def stage_breakdown(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Latency statistics and critical-path share for every stage
+
+    Args:
+        spans: Spans from tracing.load_spans
+
+    Returns:
+        One dictionary per stage, slowest total first
+    """
+    durations = defaultdict(list)
+    errors = defaultdict(int)
+    critical = defaultdict(float)
+    critical_total = 0.0
+
+    for s in spans:
+        durations[s["name"]].append(s["duration_ms"])
+        if s["status"] == "error":
+            errors[s["name"]] += 1
+
+    for trace_spans in group_traces(spans).values():
+        roots, children = _children(trace_spans)
+        for root in roots:
+            for name, seconds in critical_path(root, children):
+                critical[name] += seconds
+                critical_total += seconds
+
+    rows = []
+    for name, values in durations.items():
+        rows.append({
+            "stage": name,
+            "count": len(values),
+            "errors": errors[name],
+            "total_ms": sum(values),
+            "mean_ms": sum(values) / len(values),
+            "p50_ms": _percentile(values, 50),
+            "p95_ms": _percentile(values, 95),
+            "max_ms": max(values),
+            "critical_pct": 100 * critical[name] / critical_total if critical_total else 0.0,
+        })
+    rows.sort(key=lambda r: r["total_ms"], reverse=True)
+    return rows
+
+
+def flame_tree(spans: List[Dict[str, Any]]) -> Dict[tuple, Dict[str, float]]:
+    """
+    Aggregate span time by call stack across all traces
+
+    Args:
+        spans: Spans from tracing.load_spans
+
+    Returns:
+        Dictionary mapping stack (tuple of stage names) to total ms and count
+    """
+    stacks = defaultdict(lambda: {"total_ms": 0.0, "count": 0})
+
+    for trace_spans in group_traces(spans).values():
+        roots, children = _children(trace_spans)
+        pending = [(root, (root["name"],)) for root in roots]
+        while pending:
+            s, stack = pending.pop()
+            stacks[stack]["total_ms"] += s["duration_ms"]
+            stacks[stack]["count"] += 1
+            pending.extend((c, stack + (c["name"],)) for c in children.get(s["span_id"], []))
+
+    return dict(stacks)
+
+
+def format_report(spans: List[Dict[str, Any]], width: int = 30) -> str:
+    """
+    Render the full text report
+
+    Args:
+        spans: Spans from tracing.load_spans
+        width: Width of the flame bars in characters
+
+    Returns:
+        Report text
+    """
+    traces = group_traces(spans)
+    lines = [f"Traces: {len(traces)} runs, {len(spans)} spans", ""]
+
+    lines.append("PER-STAGE LATENCY")
+    lines.append(f"{'stage':<40} {'n':>5} {'err':>4} {'mean':>9} {'p50':>9} {'p95':>9} {'max':>9} {'crit%':>6}")
+    for r in stage_breakdown(spans):
+        lines.append(
+            f"{r['stage'][:40]:<40} {r['count']:>5} {r['errors']:>4} "
+            f"{r['mean_ms']:>7.0f}ms {r['p50_ms']:>7.0f}ms {r['p95_ms']:>7.0f}ms "
+            f"{r['max_ms']:>7.0f}ms {r['critical_pct']:>5.1f}%"
+        )
+
+    lines.append("")
+    lines.append("FLAME (total time by call stack)")
+    stacks = flame_tree(spans)
+    root_total = sum(v["total_ms"] for k, v in stacks.items() if len(k) == 1) or 1.0
+
+    def walk(prefix):
+        kids = sorted(
+            (k for k in stacks if len(k) == len(prefix) + 1 and k[:len(prefix)] == prefix),
+            key=lambda k: stacks[k]["total_ms"],
+            reverse=True
+        )
+        for stack in kids:
+            entry = stacks[stack]
+            bar = "█" * max(1, round(width * entry["total_ms"] / root_total))
+            indent = "  " * (len(stack) - 1)
+            lines.append(f"{bar:<{width}} {indent}{stack[-1]} "
+                         f"({entry['total_ms'] / 1000:.2f}s, {entry['count']}x)")
+            walk(stack)
+
+    walk(())
+    return "\n".join(lines)
@@ -0,0 +1,301 @@
+"""
+Lightweight Tracing
+Spans around pipeline stages, exported to local JSONL or OTLP/JSON files
+
+Set TRACING_ENABLED=true in .env to record spans. When disabled, span() hands
+back a shared no-op object and @traced functions are called directly, so the
+instrumentation costs one flag check per call.
+
+Environment:
+    TRACING_ENABLED: "true" to record spans
+    TRACE_FORMAT: "jsonl" (default) or "otlp"
+    TRACE_FILE: Output path (default: .state/traces/spans.jsonl or spans.otlp.jsonl)
+"""
+
+import atexit
+import contextvars
+import functools
+import inspect
+import json
+import os
+import secrets
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+# CLI entry points are traced before they call load_dotenv() themselves
+load_dotenv()
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+_enabled: Optional[bool] = None
+_buffer: List["Span"] = []
+_lock = threading.Lock()
+FLUSH_EVERY = 100
+
+
+def tracing_enabled() -> bool:
+    """Whether spans are being recorded (read once from TRACING_ENABLED)"""
+    global _enabled
+    if _enabled is None:
+        _enabled = os.getenv('TRACING_ENABLED', 'false').lower() == 'true'
+    return _enabled
+
+
+def trace_format() -> str:
+    return os.getenv('TRACE_FORMAT', 'jsonl').lower()
+
+
+def trace_path() -> Path:
+    default = '.state/traces/spans.otlp.jsonl' if trace_format() == 'otlp' else '.state/traces/spans.jsonl'
+    return Path(os.getenv('TRACE_FILE', default))
+
+
+class Span:
+    """A timed stage of the pipeline"""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attrs",
+                 "start", "end", "status", "error", "_perf", "_token")
+
+    def __init__(self, name: str, attrs: Dict[str, Any]):
+        parent = _current_span.get()
+        self.name = name
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.attrs = attrs
+        self.status = "ok"
+        self.error = None
+
+    def set(self, key: str, value: Any):
+        """Attach an attribute to the span"""
+        self.attrs[key] = value
+
+    def __enter__(self):
+        self.start = time.time()
+        self._perf = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._perf
+        self.end = self.start + duration
+        _current_span.reset(self._token)
+        if exc_type is not None and not (exc_type is SystemExit and exc.code in (0, None)):
+            self.status = "error"
+            self.error = f"{exc_type.__name__}: {exc}"
+        _export(self)
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round((self.end - self.start) * 1000, 3),
+            "status": self.status,
+            "error": self.error,
+            "attrs": self.attrs,
+        }
+
+
+class _NoopSpan:
+    """Stand-in returned when tracing is disabled"""
+
+    __slots__ = ()
+
+    def set(self, key: str, value: Any):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name: str, **attrs):
+    """
+    Time a block of code as a span
+
+    Usage:
+        with span("mastodon.search", query=query) as s:
+            ...
+            s.set("results", len(statuses))
+
+    Args:
+        name: Stage name, dotted by component (e.g. "llm.parse")
+        **attrs: Attributes recorded with the span
+
+    Returns:
+        Context manager yielding the span (a no-op when tracing is disabled)
+    """
+    if not tracing_enabled():
+        return _NOOP
+    return Span(name, attrs)
+
+
+def traced(name: Optional[str] = None):
+    """
+    Decorator that wraps every call of a function (sync or async) in a span
+
+    Args:
+        name: Span name (default: module.function)
+    """
+    def decorator(fn: Callable) -> Callable:
+        span_name = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if not tracing_enabled():
+                    return await fn(*args, **kwargs)
+                with Span(span_name, {}):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not tracing_enabled():
+                return fn(*args, **kwargs)
+            with Span(span_name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def propagate(fn: Callable) -> Callable:
+    """
+    Carry the current span into worker threads
+
+    Thread pools don't inherit context variables; wrap the submitted callable
+    so spans created inside it are parented to the caller's span.
+
+    Args:
+        fn: Callable to run in another thread
+
+    Returns:
+        Wrapped callable (fn itself when tracing is disabled)
+    """
+    if not tracing_enabled():
+        return fn
+    context = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+    return wrapper
+
+
+def _export(finished: Span):
+    with _lock:
+        _buffer.append(finished)
+        if len(_buffer) >= FLUSH_EVERY:
+            _flush_locked()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _to_otlp(spans: List[Span]) -> Dict[str, Any]:
+    otlp_spans = []
+    for s in spans:
+        otlp_span = {
+            "traceId": s.trace_id,
+            "spanId": s.span_id,
+            "name": s.name,
+            "kind": 1,
+            "startTimeUnixNano": str(int(s.start * 1e9)),
+            "endTimeUnixNano": str(int(s.end * 1e9)),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attrs.items()],
+            "status": {"code": 2, "message": s.error} if s.status == "error" else {"code": 1},
+        }
+        if s.parent_id:
+            otlp_span["parentSpanId"] = s.parent_id
+        otlp_spans.append(otlp_span)
+
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "sundai-social-agent"}}]},
+        "scopeSpans": [{"scope": {"name": "tracing"}, "spans": otlp_spans}],
+    }]}
+
+
+def _flush_locked():
+    if not _buffer:
+        return
+    path = trace_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        if trace_format() == 'otlp':
+            f.write(json.dumps(_to_otlp(_buffer), default=str) + "\n")
+        else:
+            for s in _buffer:
+                f.write(json.dumps(s.to_dict(), default=str) + "\n")
+    _buffer.clear()
+
+
+def flush():
+    """Write buffered spans to the trace file"""
+    with _lock:
+        _flush_locked()
+
+
+atexit.register(flush)
+
+
+def load_spans(path: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Read spans from a JSONL or OTLP/JSON trace file
+
+    Args:
+        path: Trace file (default: the configured TRACE_FILE)
+
+    Returns:
+        List of span dictionaries in the JSONL layout
+    """
+    path = Path(path) if path else trace_path()
+    spans = []
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if "resourceSpans" not in record:
+                spans.append(record)
+                continue
+            for resource in record["resourceSpans"]:
+                for scope in resource.get("scopeSpans", []):
+                    for s in scope.get("spans", []):
+                        start = int(s["startTimeUnixNano"]) / 1e9
+                        end = int(s["endTimeUnixNano"]) / 1e9
+                        error = s.get("status", {}).get("code") == 2
+                        spans.append({
+                            "trace_id": s["traceId"],
+                            "span_id": s["spanId"],
+                            "parent_id": s.get("parentSpanId"),
+                            "name": s["name"],
+                            "start": start,
+                            "duration_ms": (end - start) * 1000,
+                            "status": "error" if error else "ok",
+                            "error": s.get("status", {}).get("message") if error else None,
+                            "attrs": {a["key"]: next(iter(a["value"].values())) for a in s.get("attributes", [])},
+                        })
+
+    return spans